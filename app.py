@@ -5,7 +5,9 @@ from flask import Flask, request, jsonify, send_from_directory
 from tkinter import Tk, filedialog
 import organizer_logic
 import logging
-from logging.handlers import RotatingFileHandler
+from logging.handlers import RotatingFileHandler, QueueHandler, QueueListener
+import queue
+import atexit
 import json
 from datetime import datetime
 
@@ -19,13 +21,21 @@ backup_count = 2  # Number of backup log files to keep
 file_handler = RotatingFileHandler(
     log_filename, maxBytes=max_log_size, backupCount=backup_count, encoding='utf-8'
 )
-stream_handler = logging.StreamHandler(sys.stdout)
-
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[file_handler, stream_handler] # Also print logs to the console
-    )
+stream_handler = logging.StreamHandler(sys.stdout) # Also print logs to the console
+log_formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
+file_handler.setFormatter(log_formatter)
+stream_handler.setFormatter(log_formatter)
+
+# Records are only queued by the calling thread; a background listener does the
+# formatting and the (rotating) file/console writes off the request's hot path.
+log_queue = queue.SimpleQueue()
+log_listener = QueueListener(log_queue, file_handler, stream_handler, respect_handler_level=True)
+log_listener.start()
+atexit.register(log_listener.stop)
+
+root_logger = logging.getLogger()
+root_logger.setLevel(logging.INFO)
+root_logger.addHandler(QueueHandler(log_queue))
 logger = logging.getLogger(__name__)
 
 # Hide Werkzeug's default console output
@@ -150,9 +160,10 @@ def organize_files():
         logger.error("Organize request failed: No configuration provided.")
         return jsonify({"success": False, "error": "Invalid configuration."}), 400
     try:
-        log_from_logic, undo_log = organizer_logic.execute_organization_plan(config)
+        op_log, undo_log = organizer_logic.execute_organization_plan(config)
         logger.info("Organization plan executed successfully.")
-        return jsonify({"success": True, "log": log_from_logic, "undo_log": undo_log})
+        run_log = op_log.to_dict()
+        return jsonify({"success": True, "log": run_log.pop('lines'), **run_log, "undo_log": undo_log})
     except Exception as e:
         logger.error(f"Error during organization: {e}", exc_info=True)
         return jsonify({"success": False, "error": str(e)}), 500
@@ -167,13 +178,30 @@ def undo_organization():
     if not isinstance(undo_actions, list) or not target_dir:
         return jsonify({"success": False, "error": "Invalid undo data provided."}), 400
     try:
-        log_from_logic = organizer_logic.execute_undo(undo_actions, target_dir)
+        op_log = organizer_logic.execute_undo(undo_actions, target_dir)
         logger.info("Undo operation executed successfully.")
-        return jsonify({"success": True, "log": log_from_logic})
+        run_log = op_log.to_dict()
+        return jsonify({"success": True, "log": run_log.pop('lines'), **run_log})
     except Exception as e:
         logger.error(f"Error during undo operation: {e}", exc_info=True)
         return jsonify({"success": False, "error": str(e)}), 500
 
+@app.route('/api/logs/<run_id>', methods=['GET'])
+def get_run_log(run_id):
+    """Serves the full log of an organize/undo run, one page at a time."""
+    offset = request.args.get('offset', 0, type=int)
+    limit = request.args.get('limit', organizer_logic.RUN_LOG_PAGE_SIZE, type=int)
+    try:
+        page = organizer_logic.read_run_log(run_id, offset, limit)
+        return jsonify({"success": True, **page})
+    except ValueError as e:
+        return jsonify({"success": False, "error": str(e)}), 400
+    except FileNotFoundError:
+        return jsonify({"success": False, "error": "Log not found."}), 404
+    except Exception as e:
+        logger.error(f"Failed to read log for run '{run_id}': {e}", exc_info=True)
+        return jsonify({"success": False, "error": str(e)}), 500
+
 # --- Main Execution ---
 def main():
     port = 5050
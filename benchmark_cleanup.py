@@ -0,0 +1,122 @@
+"""
+Benchmark for the empty-folder cleanup that runs after a 'move' organization.
+
+Builds a deep synthetic source tree, empties the files out of a handful of leaf folders
+(as a move would) and compares the previous full bottom-up walk of the source tree with
+the plan-driven cleanup in organizer_logic, counting the directory syscalls each makes.
+
+Usage: python benchmark_cleanup.py [--depth 6] [--fanout 5] [--touched 20]
+"""
+import argparse
+import os
+import random
+import shutil
+import tempfile
+import time
+from collections import Counter
+
+import organizer_logic
+
+COUNTED_CALLS = ('scandir', 'listdir', 'rmdir')
+
+
+def legacy_folder_cleanup(root_organizing_dir):
+    """The previous cleanup: walk the whole source tree bottom-up and listdir every folder."""
+    deleted_count = 0
+    for dirpath, _, _ in os.walk(root_organizing_dir, topdown=False):
+        if os.path.abspath(dirpath) == os.path.abspath(root_organizing_dir):
+            continue
+        try:
+            if all(item in organizer_logic.IGNORED_SYSTEM_FILES for item in os.listdir(dirpath)):
+                os.rmdir(dirpath)
+                deleted_count += 1
+        except OSError:
+            pass
+    return deleted_count
+
+
+def build_tree(root, depth, fanout):
+    """Creates a fanout**depth tree of folders with one file in every leaf. Returns the leaves."""
+    leaves = [root]
+    for _ in range(depth):
+        leaves = [os.path.join(parent, f"d{i}") for parent in leaves for i in range(fanout)]
+    for leaf in leaves:
+        os.makedirs(leaf)
+        open(os.path.join(leaf, 'file.txt'), 'w').close()
+    return leaves
+
+
+def empty_leaves(root, leaves, touched, seed):
+    """Removes the files from `touched` leaves, as moving them out of the source would."""
+    random.seed(seed)
+    # Empty whole sibling groups so the cleanup also has to walk upward.
+    chosen = sorted({os.path.dirname(leaf) for leaf in random.sample(leaves, touched)})
+    touched_folders = set()
+    for parent in chosen:
+        for name in os.listdir(parent):
+            leaf = os.path.join(parent, name)
+            os.remove(os.path.join(leaf, 'file.txt'))
+            touched_folders.add(leaf)
+    return touched_folders
+
+
+class SyscallCounter:
+    """Counts calls to the directory functions in COUNTED_CALLS while active."""
+
+    def __init__(self):
+        self.counts = Counter()
+        self._originals = {}
+
+    def __enter__(self):
+        for name in COUNTED_CALLS:
+            original = getattr(os, name)
+            self._originals[name] = original
+
+            def counted(*args, _name=name, _original=original, **kwargs):
+                self.counts[_name] += 1
+                return _original(*args, **kwargs)
+            setattr(os, name, counted)
+        return self
+
+    def __exit__(self, *exc):
+        for name, original in self._originals.items():
+            setattr(os, name, original)
+
+
+def run(label, depth, fanout, touched, seed, cleanup):
+    work_dir = tempfile.mkdtemp(prefix='yezee_bench_')
+    try:
+        root = os.path.join(work_dir, 'source')
+        leaves = build_tree(root, depth, fanout)
+        touched_folders = empty_leaves(root, leaves, touched, seed)
+        with SyscallCounter() as counter:
+            start = time.perf_counter()
+            deleted = cleanup(root, touched_folders)
+            elapsed = time.perf_counter() - start
+        total = sum(counter.counts.values())
+        details = ", ".join(f"{name}={counter.counts[name]}" for name in COUNTED_CALLS)
+        print(f"{label:<14} removed {deleted:>6} folders in {elapsed * 1000:9.1f} ms | {total:>7} dir syscalls ({details})")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--depth', type=int, default=6)
+    parser.add_argument('--fanout', type=int, default=5)
+    parser.add_argument('--touched', type=int, default=20, help="Number of leaf folders emptied by the 'move'.")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    folder_count = sum(args.fanout ** level for level in range(1, args.depth + 1))
+    print(f"Synthetic tree: depth {args.depth}, fanout {args.fanout} ({folder_count} folders)")
+
+    def plan_driven(root, touched_folders):
+        return sum(1 for _, error in organizer_logic._remove_empty_folders(touched_folders, root) if not error)
+
+    run("full walk", args.depth, args.fanout, args.touched, args.seed, lambda root, _: legacy_folder_cleanup(root))
+    run("plan-driven", args.depth, args.fanout, args.touched, args.seed, plan_driven)
+
+
+if __name__ == '__main__':
+    main()
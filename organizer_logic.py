@@ -4,6 +4,10 @@ from datetime import datetime
 import logging
 import re
 import hashlib
+import heapq
+import uuid
+from collections import deque
+from itertools import islice
 
 # --- Optional Dependencies ---
 try:
@@ -46,6 +50,100 @@ TYPE_CATEGORIES = {
 
 IGNORED_SYSTEM_FILES = {'.DS_Store', 'Thumbs.db', 'desktop.ini'}
 
+# --- Operation Logs ---
+RUN_LOG_DIR = "operation_logs"  # Full per-run logs, served page by page via /api/logs/<run>
+RUN_LOG_KEEP = 20  # Number of past run logs to keep on disk
+UI_LOG_MAX_LINES = 500  # Most recent lines returned inline with an organize/undo response
+RUN_LOG_PAGE_SIZE = 500
+RUN_LOG_MAX_PAGE_SIZE = 5000
+RUN_ID_PATTERN = re.compile(r'[A-Za-z0-9_-]+')
+
+
+class OperationLog:
+    """
+    Collects the log of a single organize/undo run.
+
+    Every line is written to a per-run file on disk, while only the pinned summary
+    lines and a bounded tail of the most recent lines are kept in memory for the UI.
+    """
+
+    def __init__(self, kind, max_lines=UI_LOG_MAX_LINES):
+        self.run_id = f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{kind}_{uuid.uuid4().hex[:8]}"
+        self.counters = {}
+        self.total_lines = 0
+        self._summary = []
+        self._tail = deque(maxlen=max_lines)
+        os.makedirs(RUN_LOG_DIR, exist_ok=True)
+        _prune_run_logs()
+        self._file = open(_run_log_path(self.run_id), 'w', encoding='utf-8', buffering=1024 * 1024)
+
+    def append(self, message, counter=None):
+        """Records a log line, optionally incrementing a named counter."""
+        self._tail.append(message)
+        self._file.write(message + '\n')
+        self.total_lines += 1
+        if counter: self.count(counter)
+
+    def count(self, counter, amount=1):
+        self.counters[counter] = self.counters.get(counter, 0) + amount
+
+    def set_summary(self, lines):
+        """Pins summary lines at the top of the UI log and appends them to the file."""
+        self._summary = list(lines)
+        for line in self._summary:
+            self._file.write(line + '\n')
+            self.total_lines += 1
+
+    @property
+    def truncated(self):
+        return self.total_lines - len(self._summary) > len(self._tail)
+
+    def lines(self):
+        """Returns the bounded log shown in the UI: summary first, then the most recent lines."""
+        lines = self._summary + ([""] if self._summary else [])
+        if self.truncated:
+            lines.append(f"... showing the last {len(self._tail)} of {self.total_lines - len(self._summary)} log lines "
+                         f"(full log: /api/logs/{self.run_id}) ...")
+        lines.extend(self._tail)
+        return lines
+
+    def to_dict(self):
+        return {
+            "run_id": self.run_id, "lines": self.lines(), "counters": self.counters,
+            "total_lines": self.total_lines, "truncated": self.truncated,
+        }
+
+    def close(self):
+        if not self._file.closed: self._file.close()
+
+
+def _run_log_path(run_id):
+    return os.path.join(RUN_LOG_DIR, f"{run_id}.log")
+
+def _prune_run_logs():
+    """Keeps only the most recent RUN_LOG_KEEP run logs."""
+    try:
+        run_logs = sorted(e.path for e in os.scandir(RUN_LOG_DIR) if e.is_file() and e.name.endswith('.log'))
+    except OSError:
+        return
+    for path in run_logs[:-(RUN_LOG_KEEP - 1)]:
+        try:
+            os.remove(path)
+        except OSError as e:
+            logger.warning(f"Could not remove old run log '{path}': {e}")
+
+def read_run_log(run_id, offset=0, limit=RUN_LOG_PAGE_SIZE):
+    """Returns one page of a persisted run log. Raises FileNotFoundError for unknown runs."""
+    if not RUN_ID_PATTERN.fullmatch(run_id or ''): raise ValueError("Invalid run id.")
+    offset, limit = max(0, offset), max(1, min(limit, RUN_LOG_MAX_PAGE_SIZE))
+    with open(_run_log_path(run_id), 'r', encoding='utf-8') as f:
+        page = [line.rstrip('\n') for line in islice(f, offset, offset + limit + 1)]
+    has_more = len(page) > limit
+    return {
+        "run_id": run_id, "offset": offset, "lines": page[:limit],
+        "next_offset": offset + limit if has_more else None,
+    }
+
 def get_dependency_status():
     """Returns a dictionary indicating which optional libraries are installed."""
     return {
@@ -56,12 +154,47 @@ def get_dependency_status():
 
 def is_directory_truly_empty(path):
     try:
-        for item in os.listdir(path):
-            if item not in IGNORED_SYSTEM_FILES: return False
+        with os.scandir(path) as entries:
+            for entry in entries:
+                if entry.name not in IGNORED_SYSTEM_FILES: return False
         return True
     except OSError:
         return False
 
+def _remove_empty_folders(folders, root_dir, walk_up=True):
+    """
+    Removes the given folders, deepest first, if they are empty. Yields (folder, error) for
+    every removal attempt, with error set to the OSError when the removal failed.
+
+    Only the given folders are listed (plus, with walk_up, the parents of removed ones),
+    never the whole tree. A folder whose child is known to remain is skipped without being
+    listed, and root_dir itself and anything outside it are never removed.
+    """
+    root_prefix = os.path.join(os.path.abspath(root_dir), '')
+    pending, queued, non_empty = [], set(), set()
+
+    def push(folder):
+        if folder in queued or not folder.startswith(root_prefix): return
+        queued.add(folder)
+        heapq.heappush(pending, (-folder.count(os.sep), folder))
+
+    for folder in folders: push(os.path.abspath(folder))
+
+    while pending:
+        _, folder = heapq.heappop(pending)
+        parent = os.path.dirname(folder)
+        if folder in non_empty or not is_directory_truly_empty(folder):
+            non_empty.add(parent)
+            continue
+        try:
+            os.rmdir(folder)
+        except OSError as e:
+            non_empty.add(parent)
+            yield folder, e
+            continue
+        yield folder, None
+        if walk_up: push(parent)
+
 def get_file_category(file_path):
     ext = os.path.splitext(file_path)[1].lower()
     for category, extensions in TYPE_CATEGORIES.items():
@@ -324,104 +457,102 @@ def generate_preview_structure(config):
 
     return finalize_tree(tree)
 
-def targeted_folder_cleanup(root_organizing_dir, log, undo_actions):
-    """Performs a comprehensive, bottom-up scan and removal of empty directories."""
-    log_msg = "--- Starting comprehensive cleanup of empty folders ---"
-    log.append(log_msg)
+def targeted_folder_cleanup(root_organizing_dir, op_log, undo_actions, touched_folders):
+    """Removes the source folders emptied by the plan, walking upward towards the root as they empty."""
+    log_msg = f"--- Starting cleanup of empty folders ({len(touched_folders)} source folder(s) touched) ---"
+    op_log.append(log_msg)
     logger.info(log_msg)
     deleted_count = 0
 
-    # Walk the directory tree from the bottom up
-    for dirpath, _, _ in os.walk(root_organizing_dir, topdown=False):
-        # Safety check: never delete the root folder itself
-        if os.path.abspath(dirpath) == os.path.abspath(root_organizing_dir):
-            continue
-        try:
-            if is_directory_truly_empty(dirpath):
-                os.rmdir(dirpath)
-                rel_path = os.path.relpath(dirpath, root_organizing_dir)
-                msg = f"Cleaning up empty folder: '{rel_path}'"
-                log.append(msg)
-                logger.info(msg)
-                undo_actions.append({'action': 'deleted_folder', 'path': dirpath})
-                deleted_count += 1
-        except OSError as e:
-            err_msg = f"Could not remove '{os.path.relpath(dirpath, root_organizing_dir)}': {e}"
-            log.append(f"[ERROR] {err_msg}")
+    for dirpath, error in _remove_empty_folders(touched_folders, root_organizing_dir):
+        rel_path = os.path.relpath(dirpath, root_organizing_dir)
+        if error:
+            err_msg = f"Could not remove '{rel_path}': {error}"
+            op_log.append(f"[ERROR] {err_msg}", counter='errors')
             logger.error(err_msg)
+            continue
+        op_log.append(f"Cleaning up empty folder: '{rel_path}'", counter='folders_removed')
+        undo_actions.append({'action': 'deleted_folder', 'path': dirpath})
+        deleted_count += 1
 
     return deleted_count
 
 def execute_organization_plan(config):
-    ui_log, undo_actions = [], []
+    """Executes the organization plan. Returns the run's OperationLog and the undo actions."""
+    undo_actions = []
     source_dir, target_dir = config.get('sourceDirectory'), config.get('targetDirectory')
     logger.info(f"--- Executing organization: source '{source_dir}' -> target '{target_dir}' ---")
 
     if not target_dir or not os.path.isdir(target_dir): raise ValueError("Target directory is not valid.")
 
     final_plan = _generate_folder_and_file_names(config)
-    if not final_plan:
-        ui_log.append("No files to organize. Aborting."); logger.warning(ui_log[-1])
-        return ui_log, []
-
-    op, op_str = (shutil.move, "Moving") if config.get('operation') == 'move' else (shutil.copy2, "Copying")
-    processed, errors = 0, 0
-    created_folders = set()
-
-    ui_log.append(f"--- Starting organization of {len(final_plan)} files ---")
-
-    for dest_rel_path, file_data in final_plan.items():
-        try:
-            src_path = file_data['path']
-            if not os.path.exists(src_path):
-                ui_log.append(f"Skipping '{file_data['name']}' (file no longer at source)"); errors += 1; continue
-
-            dest_file_path = os.path.join(target_dir, dest_rel_path)
-            dest_path = os.path.dirname(dest_file_path)
-
-            if not os.path.exists(dest_path): created_folders.add(dest_path)
-            os.makedirs(dest_path, exist_ok=True)
-
-            if os.path.exists(dest_file_path):
-                counter = 1
-                base, ext = os.path.splitext(dest_file_path)
-                while os.path.exists(dest_file_path):
-                    dest_file_path = f"{base}_{counter}{ext}"
-                    counter += 1
-
-            op(src_path, dest_file_path)
-
-            if config.get('operation') == 'move':
-                undo_actions.append({'action': 'move', 'from': dest_file_path, 'to': src_path})
-            elif config.get('operation') == 'copy':
-                undo_actions.append({'action': 'copied_file', 'path': dest_file_path})
-
-            ui_log.append(f"{op_str} '{file_data['name']}' to '{os.path.relpath(dest_file_path, target_dir)}'"); processed += 1
-        except Exception as e:
-            ui_log.append(f"[ERROR] Failed to process '{file_data['name']}': {e}"); errors += 1
-            logger.error(f"Failed to process '{file_data['name']}': {e}", exc_info=True)
+    op_log = OperationLog('organize')
+    try:
+        if not final_plan:
+            op_log.append("No files to organize. Aborting."); logger.warning("No files to organize. Aborting.")
+            return op_log, []
 
-    op_past = "Moved" if config.get('operation') == 'move' else "Copied"
-    summary = f"{op_past} {processed} of {len(final_plan)} files successfully."
-    if errors: summary += f" Encountered {errors} error(s)."
-    summary_header = "="*20 + " ORGANIZATION SUMMARY " + "="*20
-    ui_log.insert(0, summary); ui_log.insert(0, summary_header)
-    ui_log.append("=" * len(summary_header))
-    logger.info(summary)
+        op, op_str = (shutil.move, "Moving") if config.get('operation') == 'move' else (shutil.copy2, "Copying")
+        processed, errors = 0, 0
+        created_folders, touched_source_folders = set(), set()
 
-    if config.get('deleteEmptyFolders') and config.get('operation') == 'move':
-        deleted = targeted_folder_cleanup(source_dir, ui_log, undo_actions)
-        cleanup_summary = f"CLEANUP SUMMARY: Removed {deleted} empty source folder(s)."
-        ui_log.extend(["\n", "="*22 + " CLEANUP REPORT " + "="*22, cleanup_summary, "="*len(summary_header)])
-        logger.info(cleanup_summary)
+        op_log.append(f"--- Starting organization of {len(final_plan)} files ---")
 
-    for folder in created_folders: undo_actions.append({'action': 'created_folder', 'path': folder})
-    logger.info("--- Organization plan execution finished. ---")
-    return ui_log, undo_actions
+        for dest_rel_path, file_data in final_plan.items():
+            try:
+                src_path = file_data['path']
+                if not os.path.exists(src_path):
+                    op_log.append(f"Skipping '{file_data['name']}' (file no longer at source)", counter='skipped'); errors += 1; continue
+
+                dest_file_path = os.path.join(target_dir, dest_rel_path)
+                dest_path = os.path.dirname(dest_file_path)
+
+                if not os.path.exists(dest_path): created_folders.add(dest_path)
+                os.makedirs(dest_path, exist_ok=True)
+
+                if os.path.exists(dest_file_path):
+                    counter = 1
+                    base, ext = os.path.splitext(dest_file_path)
+                    while os.path.exists(dest_file_path):
+                        dest_file_path = f"{base}_{counter}{ext}"
+                        counter += 1
+
+                op(src_path, dest_file_path)
+
+                if config.get('operation') == 'move':
+                    undo_actions.append({'action': 'move', 'from': dest_file_path, 'to': src_path})
+                    touched_source_folders.add(os.path.dirname(src_path))
+                elif config.get('operation') == 'copy':
+                    undo_actions.append({'action': 'copied_file', 'path': dest_file_path})
+
+                op_log.append(f"{op_str} '{file_data['name']}' to '{os.path.relpath(dest_file_path, target_dir)}'", counter='processed'); processed += 1
+            except Exception as e:
+                op_log.append(f"[ERROR] Failed to process '{file_data['name']}': {e}", counter='errors'); errors += 1
+                logger.error(f"Failed to process '{file_data['name']}': {e}", exc_info=True)
+
+        op_past = "Moved" if config.get('operation') == 'move' else "Copied"
+        summary = f"{op_past} {processed} of {len(final_plan)} files successfully."
+        if errors: summary += f" Encountered {errors} error(s)."
+        summary_header = "="*20 + " ORGANIZATION SUMMARY " + "="*20
+        summary_lines = [summary_header, summary, "=" * len(summary_header)]
+        logger.info(summary)
+
+        if config.get('deleteEmptyFolders') and config.get('operation') == 'move':
+            deleted = targeted_folder_cleanup(source_dir, op_log, undo_actions, touched_source_folders)
+            cleanup_summary = f"CLEANUP SUMMARY: Removed {deleted} empty source folder(s)."
+            summary_lines.extend(["", "="*22 + " CLEANUP REPORT " + "="*22, cleanup_summary, "="*len(summary_header)])
+            logger.info(cleanup_summary)
+
+        op_log.set_summary(summary_lines)
+        for folder in created_folders: undo_actions.append({'action': 'created_folder', 'path': folder})
+        logger.info(f"--- Organization plan execution finished. Full log: run '{op_log.run_id}' ---")
+        return op_log, undo_actions
+    finally:
+        op_log.close()
 
 
 def execute_undo(undo_actions, target_dir):
-    ui_log = []
+    """Executes an undo plan. Returns the run's OperationLog."""
     logger.info(f"--- Starting UNDO operation for {len(undo_actions)} actions. ---")
 
     moved, restored, deleted_copied = 0, 0, 0
@@ -430,57 +561,57 @@ def execute_undo(undo_actions, target_dir):
 
     undo_actions.reverse()
 
-    for action in undo_actions:
-        try:
-            action_type = action.get('action')
-            path = action.get('path')
-
-            if action_type == 'move':
-                os.makedirs(os.path.dirname(action['to']), exist_ok=True)
-                shutil.move(action['from'], action['to'])
-                ui_log.append(f"Moved back '{os.path.basename(action['to'])}'"); moved += 1
-
-            elif action_type == 'copied_file':
-                try:
-                    deleted_file_parents.add(os.path.dirname(path))
-                    os.remove(path)
-                    ui_log.append(f"Deleted copied file '{os.path.basename(path)}'"); deleted_copied += 1
-                except FileNotFoundError:
-                    logger.warning(f"Undo: Could not find copied file to delete: {path}")
-
-            elif action_type == 'deleted_folder':
-                os.makedirs(path, exist_ok=True)
-                ui_log.append(f"Restored folder '{os.path.relpath(path, target_dir)}'"); restored += 1
-
-            elif action_type == 'created_folder':
-                # This check happens at the end, after files are removed
-                pass
-
-        except Exception as e:
-            ui_log.append(f"[ERROR] Failed to undo action {action}: {e}"); errors += 1
-            logger.error(f"Failed to undo action {action}: {e}", exc_info=True)
-
-    all_created_folders = [a['path'] for a in undo_actions if a.get('action') == 'created_folder']
-    if deleted_copied > 0 or all_created_folders:
-        ui_log.append("--- Starting cleanup of empty folders from undo ---")
-        folders_to_check = deleted_file_parents.union(set(all_created_folders))
-        deleted_count = 0
-        for folder in sorted(list(folders_to_check), key=len, reverse=True):
+    op_log = OperationLog('undo')
+    try:
+        for action in undo_actions:
             try:
-                if is_directory_truly_empty(folder):
-                    os.rmdir(folder)
-                    ui_log.append(f"Cleaned up empty folder: '{os.path.relpath(folder, target_dir)}'")
-                    deleted_count += 1
-            except OSError as e:
-                logger.warning(f"Undo: Could not remove empty folder '{folder}': {e}")
-        if deleted_count > 0: ui_log.append(f"Removed {deleted_count} empty folders.")
-
-
-    summary = f"UNDO SUMMARY: Moved back {moved} files, deleted {deleted_copied} copied files, and restored {restored} folders."
-    if errors: summary += f" Encountered {errors} error(s)."
-    summary_header = "="*25 + " UNDO SUMMARY " + "="*25
-    ui_log.insert(0, summary); ui_log.insert(0, summary_header)
-    ui_log.append("=" * len(summary_header))
-    logger.info("--- UNDO operation finished. ---")
-    return ui_log
+                action_type = action.get('action')
+                path = action.get('path')
+
+                if action_type == 'move':
+                    os.makedirs(os.path.dirname(action['to']), exist_ok=True)
+                    shutil.move(action['from'], action['to'])
+                    op_log.append(f"Moved back '{os.path.basename(action['to'])}'", counter='moved'); moved += 1
+
+                elif action_type == 'copied_file':
+                    try:
+                        deleted_file_parents.add(os.path.dirname(path))
+                        os.remove(path)
+                        op_log.append(f"Deleted copied file '{os.path.basename(path)}'", counter='deleted_copied'); deleted_copied += 1
+                    except FileNotFoundError:
+                        logger.warning(f"Undo: Could not find copied file to delete: {path}")
+
+                elif action_type == 'deleted_folder':
+                    os.makedirs(path, exist_ok=True)
+                    op_log.append(f"Restored folder '{os.path.relpath(path, target_dir)}'", counter='restored'); restored += 1
+
+                elif action_type == 'created_folder':
+                    # This check happens at the end, after files are removed
+                    pass
+
+            except Exception as e:
+                op_log.append(f"[ERROR] Failed to undo action {action}: {e}", counter='errors'); errors += 1
+                logger.error(f"Failed to undo action {action}: {e}", exc_info=True)
+
+        all_created_folders = [a['path'] for a in undo_actions if a.get('action') == 'created_folder']
+        if deleted_copied > 0 or all_created_folders:
+            op_log.append("--- Starting cleanup of empty folders from undo ---")
+            folders_to_check = deleted_file_parents.union(set(all_created_folders))
+            deleted_count = 0
+            for folder, error in _remove_empty_folders(folders_to_check, target_dir, walk_up=False):
+                if error:
+                    logger.warning(f"Undo: Could not remove empty folder '{folder}': {error}")
+                    continue
+                op_log.append(f"Cleaned up empty folder: '{os.path.relpath(folder, target_dir)}'", counter='folders_removed')
+                deleted_count += 1
+            if deleted_count > 0: op_log.append(f"Removed {deleted_count} empty folders.")
+
 
+        summary = f"UNDO SUMMARY: Moved back {moved} files, deleted {deleted_copied} copied files, and restored {restored} folders."
+        if errors: summary += f" Encountered {errors} error(s)."
+        summary_header = "="*25 + " UNDO SUMMARY " + "="*25
+        op_log.set_summary([summary_header, summary, "=" * len(summary_header)])
+        logger.info(f"--- UNDO operation finished. Full log: run '{op_log.run_id}' ---")
+        return op_log
+    finally:
+        op_log.close()